@@ -8,18 +8,43 @@
     **MIT License, Copyright (c) 2024 Jensen Trillo**
 """
 import customtkinter as ctk
-from ujson import dumps as json_dumps, loads as json_loads
-from base64 import urlsafe_b64encode, urlsafe_b64decode
-from cryptography.fernet import Fernet, InvalidToken
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from gzip import open as gzip_open
+try:  # orjson when installed, which outputs bytes directly
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    from ujson import dumps, loads as json_loads
+
+    def json_dumps(obj) -> bytes:  # Non-ASCII is escaped, so encoding is a straight copy
+        return dumps(obj, ensure_ascii=True).encode('ascii')
+from base64 import urlsafe_b64encode
+from cryptography.fernet import InvalidToken
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.padding import PKCS7
+from cryptography.hazmat.primitives.kdf.hkdf import HKDFExpand
+from cryptography.hazmat.primitives.hashes import SHA256
+from hashlib import pbkdf2_hmac
+from hmac import new as hmac_new, compare_digest
 from atexit import register as exit_register
+from functools import lru_cache, wraps
+from bisect import bisect_left
+from re import compile as re_compile
+from threading import Thread, Event, RLock
+from queue import Queue
+from sortedcontainers import SortedDict
 from misc_utils import init_kill_handlers, resource_path, is_empty
 from tkinter_utils import load_fonts, set_opacity
-from os import path as os_path
+from os import path as os_path, urandom, replace, fsync
 from PIL import Image, ImageEnhance
 from numpy import array as np_array
+from sys import platform
+try:  # ISA-L accelerated gzip (same file format) when installed, for reading older data files
+    from isal.igzip import decompress as gzip_decompress
+except ImportError:
+    from gzip import decompress as gzip_decompress
+IS_WINDOWS = platform == 'win32'
+if IS_WINDOWS:  # Win32 API is only used for Caps Lock detection
+    from ctypes import windll, c_int, c_short
+    get_key_state = windll.user32.GetKeyState  # Resolved once, with a fixed signature so calls skip conversion
+    get_key_state.argtypes, get_key_state.restype = [c_int], c_short
 # DO NOT TOUCH section
 __version__ = '1.0'
 PATH = resource_path('assets/', False)  # Absolute asset path for files/resources
@@ -28,13 +53,142 @@ TRANS = '#feffff'  # Transparent color hex
 JB = 'JetBrains Mono NL'
 JBB = 'JetBrains Mono NL Bold'
 load_fonts((f'{PATH}JetBrainsMonoNL-Regular.ttf', f'{PATH}JetBrainsMonoNL-Bold.ttf'))
+# Shared button styles (unpacked into the constructors)
+ICON_BUTTON = {'fg_color': TRANS, 'hover_color': TRANS, 'text': ''}  # Image only, no background
+GREEN_BUTTON = {'fg_color': '#55BB33', 'hover_color': '#5BCA37', 'text_color': '#FAFAFA'}
 # --
 DATA_PATH = 'data.json'
+FILE_HEADER = b'PSv3'  # Start of data files: header, salt, then AES-256-CBC + HMAC-SHA256 token
+SALT_LENGTH = 16
+PBKDF2_ITERATIONS = 480000
+WRITE_DELAY = 1  # In Seconds, changes made within this period of each other are written once
 MIN_PASS_LENGTH = 8
 MAX_PASS_LENGTH = 16
+# ASCII without spaces, up to the maximum password length
+PASSWORD_MATCH = re_compile(rf'[\x00-\x1f!-\x7f]{{0,{MAX_PASS_LENGTH}}}').fullmatch
 MAX_SERVICE_LENGTH = 12
 MAX_USER_LENGTH = 128
 INACTIVITY_PERIOD = 120  # In Seconds
+SERVICE_BATCH = 10  # Service rows built per event loop pass (the first batch fills the visible area)
+# First time startup LoginScreen text
+LENGTH_TEXT = f'The password must be between {MIN_PASS_LENGTH} and {MAX_PASS_LENGTH} characters.'
+WARNING_TEXT = ('WARNING: Your password cannot be reset if you forget it. This could lead to permanent data loss! '
+                'Ensure you keep record of your password.')
+# LoginScreen title and button icon (path, size) for each mode
+LOGIN_TITLES = {'change': 'Change your password', 'new': 'Create your password', 'login': 'Enter your password'}
+LOGIN_ICONS = {'change': (f'{PATH}edit.png', (22, 22)), 'new': (f'{PATH}chev_right.png', (42, 42)),
+               'login': (f'{PATH}chev_right.png', (42, 42))}
+
+
+@lru_cache(maxsize=None)
+def _open_image(path: str, background: str = None) -> Image.Image:
+    """
+        Opens an image asset once at full resolution; repeated calls
+        with the same arguments return the cached image.
+
+        :param path: :class:`str` Path to the image file
+        :param background: :class:`str` Hex colour to flatten the image onto, producing an
+            opaque ``RGB`` image (no alpha for Tk to blend); `default=None`
+        :returns: :class:`Image.Image`
+    """
+    with Image.open(path) as f:  # Decode once up front and release the file handle
+        image = f.copy()
+    if background:
+        image = Image.alpha_composite(Image.new('RGBA', image.size, background), image.convert('RGBA')).convert('RGB')
+    return image
+
+
+@lru_cache(maxsize=None)
+def _load_image(path: str, size: tuple[int, int]) -> tuple[Image.Image, ctk.CTkImage]:
+    """
+        Cached image asset and its :class:`ctk.CTkImage`, so screens can be
+        rebuilt without decoding the file again. The source is kept at full
+        resolution, as :class:`ctk.CTkImage` resamples it to the scaled
+        display size itself.
+
+        :param path: :class:`str` Path to the image file
+        :param size: :class:`tuple` (:class:`int` width ``px``, :class:`int` height ``px``)
+        :returns: :class:`tuple` (:class:`Image.Image`, :class:`ctk.CTkImage`)
+    """
+    image = _open_image(path)
+    return image, ctk.CTkImage(image, size=size)
+
+
+@lru_cache(maxsize=None)
+def _brightness_image(path: str, size: tuple[int, int], brightness: float, angle: int = 0) -> ctk.CTkImage:
+    """
+        Cached image asset with a different brightness (**brighter** ``[>1.0]`` /
+        **darker** ``[<1.0]``), optionally rotated. The per-pixel pass runs once
+        per icon instead of once per widget.
+
+        :param path: :class:`str` Path to the image file
+        :param size: :class:`tuple` (:class:`int` width ``px``, :class:`int` height ``px``)
+        :param brightness: :class:`float` New brightness
+        :param angle: :class:`int` Counter-clockwise rotation in degrees; `default=0`
+        :returns: :class:`ctk.CTkImage`
+    """
+    image = ImageEnhance.Brightness(_open_image(path)).enhance(brightness)
+    return ctk.CTkImage(image.rotate(angle) if angle else image, size=size)
+
+
+@lru_cache(maxsize=None)
+def _tinted_image(path: str, size: tuple[int, int], color: tuple[int, int, int]) -> ctk.CTkImage:
+    """
+        Cached image asset with every pixel set to one colour,
+        keeping only its shape (alpha channel).
+
+        :param path: :class:`str` Path to the image file
+        :param size: :class:`tuple` (:class:`int` width ``px``, :class:`int` height ``px``)
+        :param color: :class:`tuple` (:class:`int` R, :class:`int` G, :class:`int` B)
+        :returns: :class:`ctk.CTkImage`
+    """
+    image = np_array(_open_image(path))
+    image[..., :-1] = color
+    return ctk.CTkImage(Image.fromarray(image), size=size)
+
+
+try:  # Rust implementation of Fernet (same token format) when installed
+    from rfernet import Fernet as RFernet, DecryptionError
+
+    class Fernet:
+        """
+            Read only wrapper giving ``rfernet`` the same :class:`bytes` decrypt
+            interface as :class:`cryptography.fernet.Fernet`, raising
+            :class:`InvalidToken` on failed decryption.
+
+            :param key: :class:`bytes` URL-safe base64 encoded 32-byte key
+        """
+        def __init__(self, key: bytes):
+            self._fernet = RFernet(key.decode())
+
+        def decrypt(self, token: bytes) -> bytes:
+            try:
+                return self._fernet.decrypt(token.decode())
+            except (DecryptionError, UnicodeDecodeError):
+                raise InvalidToken
+except ImportError:
+    from cryptography.fernet import Fernet
+
+
+def _changes_data(func):
+    """
+        Decorator for :class:`Manager` methods which change the
+        data, run under the data lock. Marks the data as changed
+        and queues a background write.
+    """
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            changing, self._changing = self._changing, True  # Checked by the kill handler
+            try:
+                result = func(self, *args, **kwargs)
+                self._dirty = True
+            finally:
+                self._changing = changing
+        if self._queue.empty():  # Coalesce with a write which is already queued
+            self._queue.put(True)
+        return result
+    return wrapper
 
 
 class Manager:
@@ -51,47 +205,158 @@ class Manager:
     """
     def __init__(self, data_path: str, password: str):
         self._path = data_path  # Set data path
-        self._key = self.__derive_key(password)  # Get the encryption key using password
-        self._data = self.__read()  # Read the JSON file from data path using new encryption key
+        self._dirty = False  # Set when the data has changed since the last write
+        self._password = None  # Only kept until a new key is derived
+        self._changing = False  # Set while a change holds the data lock
+        # Read the JSON file from data path (which sets the salt and key used for every read/write),
+        # kept sorted by service name
+        self._data = SortedDict(self.__read(password))
+        # Writes happen on a background thread, the lock keeps the data from changing while it is serialised
+        self._lock, self._queue, self._stop = RLock(), Queue(), Event()
+        self._writer = Thread(target=self.__write_loop, daemon=True)
+        self._writer.start()
+        if self._dirty:  # New and older data files are written now, deriving the key and dropping the password
+            self._queue.put(True)
         # Kill and exit handlers
-        init_kill_handlers(lambda *_: self.write())
+        init_kill_handlers(lambda *_: self.__kill())
         exit_register(self.write)
 
     @staticmethod
-    def __derive_key(password: str) -> bytes:
-        kdf = PBKDF2HMAC(hashes.SHA256(), 32, ''.join(sorted(password))[::-1].encode(), 480000)
-        return urlsafe_b64encode(kdf.derive(password.encode()))
+    def __derive_key(password: str, salt: bytes) -> bytes:
+        # OpenSSL's PBKDF2 through hashlib, a single 32 byte block (what Fernet keys were made from)
+        return pbkdf2_hmac('sha256', password.encode(), salt, PBKDF2_ITERATIONS)
 
+    def __cipher_key(self, password: str, salt: bytes) -> bytes:
+        # HKDF-SHA256 expansion of the derived key into a 32 byte AES key then 32 byte HMAC key,
+        # so PBKDF2 only runs once
+        return HKDFExpand(SHA256(), 64, b'Password Safe').derive(self.__derive_key(password, salt))
+
+    def __new_key(self, password: str):
+        # Random salt for the vault, stored in the data file. The key is only derived once it is needed to
+        # write, so new vaults and password changes do not wait on PBKDF2
+        self._salt, self._key, self._password = urandom(SALT_LENGTH), None, password
+
+    @staticmethod
+    def __encrypt(key: bytes, data: bytes) -> bytes:
+        # IV, AES-256-CBC ciphertext, then HMAC-SHA256 of both
+        padder, iv = PKCS7(128).padder(), urandom(16)
+        encryptor = Cipher(algorithms.AES(key[:32]), modes.CBC(iv)).encryptor()
+        token = iv + encryptor.update(padder.update(data) + padder.finalize()) + encryptor.finalize()
+        return token + hmac_new(key[32:], token, 'sha256').digest()
+
+    @staticmethod
+    def __decrypt(key: bytes, token: bytes) -> bytes:
+        token, tag = token[:-32], token[-32:]
+        if not compare_digest(hmac_new(key[32:], token, 'sha256').digest(), tag):  # Wrong password
+            raise InvalidToken
+        unpadder = PKCS7(128).unpadder()
+        decryptor = Cipher(algorithms.AES(key[:32]), modes.CBC(token[:16])).decryptor()
+        return unpadder.update(decryptor.update(token[16:]) + decryptor.finalize()) + unpadder.finalize()
+
+    @_changes_data
     def change_password(self, password: str):
         """
             Change the password of the manager.
 
             :param password: :class:`str` New password
         """
-        self._key = self.__derive_key(password)  # Get the encryption key using password
+        self.__new_key(password)  # Get the encryption key using password and a new salt
 
-    def __read(self) -> dict:
+    def __read(self, password: str) -> dict:
         try:
-            with gzip_open(self._path, 'rb') as f:
-                # InvalidToken will be raised here
-                return json_loads(Fernet(self._key).decrypt(urlsafe_b64encode(f.read())))
-        except FileNotFoundError:  # Return empty data dict
+            with open(self._path, 'rb') as f:
+                token = f.read()
+        except FileNotFoundError:  # Return empty data dict, written straight away so the file exists
+            self.__new_key(password)
+            self._dirty = True
             return {}
+        if token[:2] == b'\x1f\x8b':  # Older files are gzip compressed
+            token = gzip_decompress(token)
+        header, salt = token[:len(FILE_HEADER)], token[len(FILE_HEADER):len(FILE_HEADER) + SALT_LENGTH]
+        if header == FILE_HEADER:  # Header, salt then token
+            self._salt, self._key = salt, self.__cipher_key(password, salt)
+            # InvalidToken will be raised here
+            return json_loads(self.__decrypt(self._key, token[len(FILE_HEADER) + SALT_LENGTH:]))
+        # Older files have no header, the salt was derived from the password
+        # Files from version 1.0 hold the base64 decoded token (starting with the 0x80 Fernet version byte)
+        if token[:1] == b'\x80':
+            token = urlsafe_b64encode(token)
+        key = self.__derive_key(password, ''.join(sorted(password))[::-1].encode())
+        # InvalidToken will be raised here
+        data = json_loads(Fernet(urlsafe_b64encode(key)).decrypt(token))
+        # Rewritten with a random salt
+        self.__new_key(password)
+        self._dirty = True
+        return data
+
+    def __write_loop(self):
+        while self._queue.get():  # None stops the loop
+            self._stop.wait(WRITE_DELAY)  # Wait for any following changes (cut short by write())
+            try:
+                self.__write()
+            except Exception:  # Keep writing later changes, the data is still marked as changed
+                pass
+
+    def __write(self):
+        with self._lock:
+            if not self._dirty:  # Nothing has changed since the last write
+                return
+            self._dirty = False
+            data, key, salt, password = json_dumps(self._data), self._key, self._salt, self._password
+        try:
+            if key is None:  # New salt, derive the key outside the lock
+                key = self.__cipher_key(password, salt)
+                with self._lock:
+                    if self._salt is salt:  # Salt has not changed again since
+                        self._key, self._password = key, None
+            # Not compressed, as the ciphertext does not compress (gzip only made it larger)
+            token, temp_path = self.__encrypt(key, data), f'{self._path}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(FILE_HEADER + salt)
+                f.write(token)
+                f.flush()
+                fsync(f.fileno())
+            # Swapped in whole, so a failed write never leaves the data file truncated
+            replace(temp_path, self._path)
+        except Exception:
+            with self._lock:
+                self._dirty = True  # Written again with the next change or on exit
+            raise
 
     def write(self):
-        with gzip_open(self._path, 'wb', 9) as f:
-            f.write(urlsafe_b64decode(Fernet(self._key).encrypt(json_dumps(self._data).encode())))
+        """
+            Stops the background writer and writes any
+            unsaved changes. Used on exit and logout.
+        """
+        self.__stop_writer()
+        self._writer.join()
+        self.__write()
+
+    def __stop_writer(self):
+        self._stop.set()  # Cut the write delay short
+        self._queue.put(None)
+
+    def __kill(self):
+        # Signal handlers run on the main thread, which may be part way through a change holding the data lock.
+        # The writer could be waiting on that lock, so it is only told to stop (joining it would never return)
+        if self._changing:
+            self.__stop_writer()
+            self.__write()
+        else:
+            self.write()
 
-    def get_services(self) -> dict:
+    def get_services(self) -> SortedDict:
         """
-            Returns an alphabetically sorted
-            data dictionary.
+            Returns the alphabetically sorted data
+            dictionary. This is the live data (kept sorted
+            on every change), so it must not be modified directly.
 
-            :returns: :class:`dict` Sorted data
+            :returns: :class:`SortedDict` Sorted data
         """
-        return {k: self._data[k] for k in sorted(self._data)}
+        return self._data
 
     # Service methods
+    @_changes_data
     def add_service(self, name: str, data):
         """
             Adds a service; the name is case-sensitive. If
@@ -106,6 +371,7 @@ class Manager:
         else:  # Already exists
             raise KeyError
 
+    @_changes_data
     def rename_service(self, name: str, new: str):
         """
             Changes the name of an existing service.
@@ -121,9 +387,10 @@ class Manager:
         if new in self._data:  # New name conflicts with existing name
             raise ValueError
         else:
-            # Add service with new name and existing data, then delete old instance
-            self.add_service(new, self._data[name]), self.delete_service(name)
+            # Move the existing data to the new name (KeyError from pop() before anything is added)
+            self._data[new] = self._data.pop(name)
 
+    @_changes_data
     def delete_service(self, name: str):
         """
             Deletes the service. :class:`KeyError` will be raised
@@ -134,6 +401,7 @@ class Manager:
         self._data.pop(name)
 
     # Account methods
+    @_changes_data
     def add_account(self, service: str, username: str, password: str):
         """
             Add a new account under the service.
@@ -151,6 +419,7 @@ class Manager:
         else:  # Account already exists
             raise ValueError
 
+    @_changes_data
     def edit_account(self, service: str, username: str, change: bool, new: str):
         """
             Edits the username or password of an account.
@@ -179,6 +448,7 @@ class Manager:
         else:  # Edit password
             self._data[service][username] = new
 
+    @_changes_data
     def delete_account(self, service: str, username: str):
         """
              Deletes the account under the service.
@@ -213,29 +483,28 @@ class GUI(ctk.CTk):
     def __init__(self):
         # 〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉
         # LOCAL UTILITY FUNCTIONS
-        def img_button_brightness(obj: ctk.CTkButton | ctk.CTkLabel, image: Image.Image, size: tuple[int, int],
-                                  brightness: float):
+        def img_button_hover(obj: ctk.CTkButton | ctk.CTkLabel, images: tuple[ctk.CTkImage, ctk.CTkImage]):
             """
-                Sets up the necessary bindings for the provided image
-                to change brightness (**brighter** ``[>1.0]`` / **darker** ``[<1.0]``) on
-                hover.
+                Sets up the necessary bindings for the provided images
+                to swap between them on hover (e.g. a pre-brightened
+                copy of the icon).
 
-                - This function will apply the provided :class:`Image.Image` to the widget,
+                - This function will apply the default image to the widget,
                   so there is no need to specify the ``image=`` keyword in the widget constructor
 
                 :param obj: :class:`ctk.CTkButton` or :class:`ctk.CTkLabel` to apply the bindings to
-                :param image: :class:`Image.Image`
-                :param size: :class:`tuple` (:class:`int` width ``px``, :class:`int` height ``px``)
-                :param brightness: :class:`float` New brightness on hover
+                :param images: :class:`tuple` (:class:`ctk.CTkImage` default, :class:`ctk.CTkImage` hover)
             """
-            default = ctk.CTkImage(image, size=size)
-            hover = ctk.CTkImage(ImageEnhance.Brightness(image).enhance(brightness), size=size)
+            default, hover = images
             obj.configure(image=default, require_redraw=True)
             obj.bind('<Enter>', lambda _: obj.configure(image=hover))
             obj.bind('<Leave>', lambda _: obj.configure(image=default))
 
         def manager_wrapper(password: str):  # Cleanest way of setting manager class var
             self.manager = Manager(DATA_PATH, password)
+            # The background writer saves a new vault within WRITE_DELAY. is_new is only read by show_login for the
+            # first LoginScreen, this just keeps it accurate for any later reader without stat'ing the file again
+            self.is_new = False
 
         def switch_screen(new: ctk.CTkFrame, preserve: bool = False):
             new.place(x=0, y=0)  # Has to be place(), else flicker will occur
@@ -246,13 +515,22 @@ class GUI(ctk.CTk):
         def ctrl_backspace_bind(obj):
             obj.bind('<Control-KeyPress-BackSpace>', lambda _: obj.delete(0, 'end'))
 
-        show = ctk.CTkImage(Image.open(f'{PATH}show.png'), size=(20, 20))
-        hide = ctk.CTkImage(Image.open(f'{PATH}hide.png'), size=(20, 20))
+        def validate_password(action, text: str) -> bool:  # Password entry validate command
+            if text == 'Password changed':
+                return True
+            if int(action):  # Insert
+                # Below maximum password length, does not include spaces and is not Unicode (one C-level match)
+                return PASSWORD_MATCH(text) is not None
+            else:  # Backspace/deletion
+                return True
+
+        show = _load_image(f'{PATH}show.png', (20, 20))[1]
+        hide = _load_image(f'{PATH}hide.png', (20, 20))[1]
 
         class Visibility(ctk.CTkButton):
             def __init__(self, master, entry: ctk.CTkEntry, **kw):
-                super().__init__(master, height=20, fg_color=TRANS, text='', hover_color=TRANS,
-                                 command=lambda: toggle_visibility(entry, self), image=hide, **kw)
+                super().__init__(master, height=20, command=lambda: toggle_visibility(entry, self), image=hide,
+                                 **ICON_BUTTON, **kw)
                 set_opacity(self, color=TRANS)
 
         def toggle_visibility(entry: ctk.CTkEntry, obj: Visibility):
@@ -268,96 +546,92 @@ class GUI(ctk.CTk):
             def __init__(self, master):
                 manager = master.manager  # So it can be accessed anywhere
 
-                # Local Components
+                # Local Components, built with each MainScreen as they close over its manager, search, sorting
+                # and services. The row classes nested in them are built with them, not once per row
                 class Services(ctk.CTkScrollableFrame):  # Scrollable frame for containing services and accounts
                     class Service(ctk.CTkFrame):
                         # noinspection PyUnresolvedReferences
                         class Account(ctk.CTkFrame):
+                            # noinspection PyUnresolvedReferences
+                            class EntryObj(ctk.CTkEntry):
+                                def __init__(self, _master, username_: bool, **kwargs):
+                                    # +2 for the cursor to be visible
+                                    super().__init__(_master, 242, 25, 0, 0, placeholder_text_color='#919191',
+                                                     fg_color='transparent', validate='key',
+                                                     validatecommand=account_validation, **kwargs)
+                                    self.username_, self.binding = username_, None
+                                    # ... overflow label
+                                    self.extended = ctk.CTkLabel(self, text='...', text_color='#919191',
+                                                                 font=('JB', 20))
+                                    self.extended.bind('<Button-1>', lambda _: (self.focus_set(), self.icursor(19)))
+                                    self.bind('<FocusIn>', lambda _: self.overflow(False))
+                                    self.bind('<FocusOut>', lambda _: self.overflow(True)
+                                              if len(self.get()) > 18 else None)
+                                    # --
+                                    self.bind('<KeyRelease-Escape>',
+                                              lambda _: _master.handle_change(True, self, True))
+                                    self.bind('<FocusOut>',
+                                              lambda _: _master.handle_change(False, self, focusout=True))
+                                    ctrl_backspace_bind(self)
+                                    if _master.username:  # User & pass is provided
+                                        self.bind('<KeyRelease-Return>', lambda _:
+                                                  _master.focus_set() if _master.rename(self) else None)
+
+                                def overflow(self, on: bool):
+                                    if on:
+                                        self.extended.place(x=222, y=0)
+                                    else:
+                                        self.extended.place_forget()
+
+                                def unconfirmed_binding(self, obj):
+                                    # Added to bindings() so they can be removed on create()
+                                    # all() in lambda otherwise it would be called twice for handle_change()
+                                    def handle(e):
+                                        enter = str(e.keysym) == 'Return'
+                                        if self.master.error:  # Already exists
+                                            s, fg, txt = False, '#eb2121', 'Already exists'
+                                            if enter:  # Move back to conflicting username
+                                                self.master.username_obj.focus_set()
+                                        # Allow creation
+                                        elif all(not is_empty(x) for x in
+                                                 {self.master.username_obj.get(), self.master.password_obj.get()}):
+                                            s, fg, txt = True, '#40ACE3', 'Create account'
+                                            if enter:
+                                                self.master.create()
+                                        else:  # Grey out button
+                                            s, fg, txt = False, '#b0b0b0', 'Create account'
+                                            if enter and not is_empty(self.get()):
+                                                obj.focus_set()
+                                        self.master.master.add_acc.configure(state='normal' if s else 'disabled',
+                                                                             fg_color=fg, text=txt)
+                                    self.binding = self._entry.bind('<KeyRelease>', handle, '+')
+
+                                def remove_binding(self):
+                                    self._entry.unbind('<KeyRelease>', self.binding)
+                                    self.bind('<KeyRelease-Return>', lambda _: (
+                                        self.master.focus_set() if self.master.rename(self)
+                                        else None
+                                    ))
+
                             def __init__(self, _master, username: str = None, password: str = None,
                                          focus: bool = False):
-                                # noinspection PyUnresolvedReferences
-                                class EntryObj(ctk.CTkEntry):
-                                    def __init__(self, _master, username_: bool, **kwargs):
-                                        # +2 for the cursor to be visible
-                                        super().__init__(_master, 242, 25, 0, 0, placeholder_text_color='#919191',
-                                                         fg_color='transparent', validate='key',
-                                                         validatecommand=_master.validation, **kwargs)
-                                        self.username_, self.binding = username_, None
-                                        # ... overflow label
-                                        self.extended = ctk.CTkLabel(self, text='...', text_color='#919191',
-                                                                     font=('JB', 20))
-                                        self.extended.bind('<Button-1>', lambda _: (self.focus_set(), self.icursor(19)))
-                                        self.bind('<FocusIn>', lambda _: self.overflow(False))
-                                        self.bind('<FocusOut>', lambda _: self.overflow(True)
-                                                  if len(self.get()) > 18 else None)
-                                        # --
-                                        self.bind('<KeyRelease-Escape>',
-                                                  lambda _: _master.handle_change(True, self, True))
-                                        self.bind('<FocusOut>',
-                                                  lambda _: _master.handle_change(False, self, focusout=True))
-                                        ctrl_backspace_bind(self)
-                                        if username:  # User & pass is provided
-                                            self.bind('<KeyRelease-Return>', lambda _:
-                                                      _master.focus_set() if _master.rename(self) else None)
-
-                                    def overflow(self, on: bool):
-                                        if on:
-                                            self.extended.place(x=222, y=0)
-                                        else:
-                                            self.extended.place_forget()
-
-                                    def unconfirmed_binding(self, obj):
-                                        # Added to bindings() so they can be removed on create()
-                                        # all() in lambda otherwise it would be called twice for handle_change()
-                                        def handle(e):
-                                            enter = str(e.keysym) == 'Return'
-                                            if self.master.error:  # Already exists
-                                                s, fg, txt = False, '#eb2121', 'Already exists'
-                                                if enter:  # Move back to conflicting username
-                                                    self.master.username_obj.focus_set()
-                                            # Allow creation
-                                            elif all(not is_empty(x) for x in
-                                                     {self.master.username_obj.get(), self.master.password_obj.get()}):
-                                                s, fg, txt = True, '#40ACE3', 'Create account'
-                                                if enter:
-                                                    self.master.create()
-                                            else:  # Grey out button
-                                                s, fg, txt = False, '#b0b0b0', 'Create account'
-                                                if enter and not is_empty(self.get()):
-                                                    obj.focus_set()
-                                            self.master.master.add_acc.configure(state='normal' if s else 'disabled',
-                                                                                 fg_color=fg, text=txt)
-                                        self.binding = self._entry.bind('<KeyRelease>', handle, '+')
-
-                                    def remove_binding(self):
-                                        self._entry.unbind('<KeyRelease>', self.binding)
-                                        self.bind('<KeyRelease-Return>', lambda _: (
-                                            self.master.focus_set() if self.master.rename(self)
-                                            else None
-                                        ))
-                                # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
                                 super().__init__(_master, 300, 82, 5, fg_color='#FFFFFF')
                                 self.grid_propagate(False), self.grid_anchor('center')
                                 self.username, self.password, self.error, self.delete = username, password, False, True
                                 self.current_conflict = None
-                                self.validation = (self.register(lambda t: ' ' not in t and len(t) <= MAX_USER_LENGTH),
-                                                   '%P')
                                 # IMAGES
-                                garbage = ctk.CTkImage(i := Image.open(f'{PATH}garbage.png'))
-                                garbage_h = np_array(i)
-                                garbage_h[..., :-1] = (255, 10, 10)
-                                self.garbage_h = ctk.CTkImage(Image.fromarray(garbage_h))
+                                garbage = _load_image(f'{PATH}garbage.png', (20, 20))[1]
+                                self.garbage_h = _tinted_image(f'{PATH}garbage.png', (20, 20), (255, 10, 10))
                                 # --
                                 # Username + password entries
-                                self.username_obj = EntryObj(self, True, placeholder_text='Username',
-                                                             text_color='#2A295E', font=(JB, 20))
-                                self.password_obj = EntryObj(self, False, placeholder_text='Password',
-                                                             text_color='#0E0D2C', font=(JBB, 20), show='*')
+                                self.username_obj = self.EntryObj(self, True, placeholder_text='Username',
+                                                                  text_color='#2A295E', font=(JB, 20))
+                                self.password_obj = self.EntryObj(self, False, placeholder_text='Password',
+                                                                  text_color='#0E0D2C', font=(JBB, 20), show='*')
                                 # Buttons
                                 self.visibility = Visibility(self, self.password_obj, width=20, anchor='w')
                                 self.visibility.grid(row=1, column=1, sticky='w', padx=(10, 0))
-                                (delete := ctk.CTkButton(self, 18, 18, anchor='w', fg_color=TRANS,
-                                                         hover_color=TRANS, text='', image=garbage,
+                                (delete := ctk.CTkButton(self, 18, 18, anchor='w', image=garbage, **ICON_BUTTON,
                                                          command=lambda: (
                                         ((manager.delete_account(self.master.name, self.username), self.__delete())
                                         if self.username else
@@ -486,40 +760,39 @@ class GUI(ctk.CTk):
                                         return
                                     self.create(change_focus)
 
+                        # Has to be own class for its identifying name in mouse_off()
+                        class AddAccount(ctk.CTkButton):
+                            def __init__(self, m, accounts: dict):
+                                super().__init__(m, 300, 25, 5, **GREEN_BUTTON,
+                                                 text=f'Add{" another" if len(accounts) > 0 else ""} account',
+                                                 font=(JB, 14), command=m.add_acc_cmd, text_color_disabled='#FAFAFA')
+
                         def __init__(self, _master, accounts: dict, name: str = None):
-                            # Has to be own class for its identifying name in mouse_off()
-                            class AddAccount(ctk.CTkButton):
-                                def __init__(self, m):
-                                    super().__init__(m, 300, 25, 5, fg_color='#55BB33', text_color='#FAFAFA',
-                                                     text=f'Add{" another" if len(accounts) > 0 else ""} account',
-                                                     font=(JB, 14), hover_color="#5BCA37", command=m.add_acc_cmd,
-                                                     text_color_disabled='#FAFAFA')
-                            # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
                             super().__init__(_master, 390, 45, 10, fg_color='#EAEAEA')
                             self.grid_propagate(False), self.grid_anchor('nw')
                             self.name, self.delete_step, self.dropdown, self.f_dropdown = name, False, False, True
                             self.current_conflict = None
+                            self.lower_name = name.lower() if name else None  # Cached for the search index
+                            self.row = None  # Grid row, kept by Services
                             self.accounts = []  # List of Account objects
                             # Chevron + Service name
-                            self.img = ImageEnhance.Brightness(Image.open(f'{PATH}chev_right.png')).enhance(0)
                             self.button = ctk.CTkButton(self, anchor='w', fg_color='#EAEAEA',
                                                         hover_color="#EAEAEA", text='', command=self.__toggle_dropdown,
-                                                        image=ctk.CTkImage(self.img, size=(20, 20)))
+                                                        image=_brightness_image(f'{PATH}chev_right.png', (20, 20), 0))
                             self.label = ctk.CTkEntry(self, 160, 20, 0, 0, text_color='#3D3D3D', font=(JB, 20),
                                                       fg_color='transparent', validate='key',
-                                                      validatecommand=(self.register(
-                                                          lambda t: len(t) <= MAX_SERVICE_LENGTH), '%P'))
+                                                      validatecommand=service_validation)
                             # Dropdown objects
                             self.delete = ctk.CTkButton(self, 0, 12, 5, 0, fg_color='transparent',
-                                                        text='Delete service', text_color='#CC0202', font=(JB, 12),
+                                                        text='Delete service', text_color='#CC0202', font=font_jb12,
                                                         hover_color='#EAEAEA', image=
-                                                        ctk.CTkImage(Image.open(f'{PATH}delete.png'), size=(12, 12)),
+                                                        _load_image(f'{PATH}delete.png', (12, 12))[1],
                                                         command=self.__deletion_confirmation, border_color='#CC0202')
-                            self.add_acc = AddAccount(self)
+                            self.add_acc = self.AddAccount(self, accounts)
                             self.error = (  # Tuple of error lambda, clear error lambda & object
                                 lambda: (self.label.configure(text_color='#ff3333'), self.error[2].place(x=268, y=8)),
                                 lambda: (self.__reset_conflict(), self.error[2].place_forget()),
-                                ctk.CTkLabel(self, text='Already exists', text_color='#eb2121', font=(JB, 12))
+                                ctk.CTkLabel(self, text='Already exists', text_color='#eb2121', font=font_jb12)
                             )
 
                             # BINDINGS
@@ -556,12 +829,13 @@ class GUI(ctk.CTk):
                                 # it can be handled first
                                 self.after(1, lambda: (
                                     self.configure(height=45),
-                                    self.button.configure(image=ctk.CTkImage(self.img, size=(20, 20)))
+                                    self.button.configure(image=_brightness_image(f'{PATH}chev_right.png', (20, 20), 0))
                                 ))
                             else:  # Make dropdown
                                 self.configure(  # Make the frames height: 115 + (# of accounts * (82 + 3px Y padding))
                                     height=(height := 115 + ((l := len(manager.get_services()[self.name])) * 85)))
-                                self.button.configure(image=ctk.CTkImage(self.img.rotate(270), size=(20, 20)))
+                                self.button.configure(
+                                    image=_brightness_image(f'{PATH}chev_right.png', (20, 20), 0, 270))
                                 self.delete.place(x=8, y=height - 34)
                                 if self.f_dropdown:  # Create only on first time
                                     self.f_dropdown = False
@@ -588,6 +862,8 @@ class GUI(ctk.CTk):
                                 # --
                                 manager.delete_service(self.name)
                                 self.destroy(), self.master.service_objects.remove(self)
+                                self.master.index = None
+                                self.master.shown.discard(self)
                                 if len(_s := manager.get_services()) == 1:  # Only one service, clear search query
                                     search.state_check(_s)  # Check if # of services allows search to be enabled
                                     search.query.delete(0, 'end'), self.master.query()
@@ -627,7 +903,7 @@ class GUI(ctk.CTk):
                             if self.name != (new := self.label.get()) and not is_empty(new):
                                 try:
                                     manager.rename_service(self.name, new)  # ValueError
-                                    self.name = new
+                                    self.name, self.lower_name, self.master.index = new, new.lower(), None
                                     if q := search.query.get():  # Search query active
                                         self.master.query(q)
                                     services.sort(sorting.cget('text') != 'A-Z')  # Re-sort the order
@@ -644,7 +920,7 @@ class GUI(ctk.CTk):
                                     self.label.bind('<KeyRelease-Return>',  # ENTER to rename service
                                                     lambda _: self.focus_set() if self.__rename() else None)
                                     self.button.configure(state='normal'), self.focus_set()
-                                    self.master.adding, self.name = False, new
+                                    self.master.adding, self.name, self.lower_name = False, new, new.lower()
                                     services.sort(sorting.cget('text') != 'A-Z')  # Re-sort the order
                                     search.state_check()  # Check if # of services allows search to be enabled
                                 except KeyError:  # Already exists
@@ -697,35 +973,61 @@ class GUI(ctk.CTk):
                                 except ValueError:
                                     pass
 
+                    class Start(ctk.CTkFrame):  # For when there are 0 services
+                        def __init__(self, m):
+                            super().__init__(m, 390, 348, 0, fg_color='transparent')
+                            self.grid_propagate(False), self.grid_anchor('center')
+                            ctk.CTkLabel(self, text='You have 0 services', text_color='#3295C7',
+                                         font=(JB, 20)).grid(row=0)
+                            ctk.CTkButton(self, 230, 25, 5, **GREEN_BUTTON, text=f'Add service', font=(JB, 14),
+                                          command=m.add).grid(row=1, pady=(6, 0))
+
                     def __init__(self, _master):
-                        class Start(ctk.CTkFrame):  # For when there are 0 services
-                            def __init__(self, m):
-                                super().__init__(m, 390, 348, 0, fg_color='transparent')
-                                self.grid_propagate(False), self.grid_anchor('center')
-                                ctk.CTkLabel(self, text='You have 0 services', text_color='#3295C7',
-                                             font=(JB, 20)).grid(row=0)
-                                ctk.CTkButton(self, 230, 25, 5, fg_color='#55BB33', text_color='#FAFAFA',
-                                              text=f'Add service', font=(JB, 14), hover_color="#5BCA37",
-                                              command=lambda: services.add(),
-                                              ).grid(row=1, pady=(6, 0))
-                        # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
                         super().__init__(_master, 390, 350, 0, fg_color='transparent')
                         # So border goes fully around
                         self._scrollbar.configure(bg_color=TRANS), set_opacity(self._scrollbar, color=TRANS)
                         # 'double' for double click to set focus, 'adding' for in the process of adding new service
                         self.double, self.adding, self.service_objects = False, False, []
+                        # Search index of (lowercase names, objects) sorted by lowercase name, rebuilt when set to None
+                        # after services change, and the set of objects currently shown by the search query
+                        self.index, self.shown = None, set()
                         # Special messages
                         self.no_results = ctk.CTkLabel(self, 390, 348, text='No results...', text_color='#eb2121',
                                                        font=(JB, 20))
-                        self.no_services = Start(self)
+                        self.no_services = self.Start(self)
                         # --
-                        for i, (service, accounts) in enumerate((s := manager.get_services()).items()):
+                        # Only the first rows are built now, the rest are built in batches once the screen is shown
+                        self.pending = list(s := manager.get_services())
+                        for i, service in enumerate(self.pending[:SERVICE_BATCH]):
                             # Place services
-                            self.service_objects.append(o := self.Service(self, accounts, service))
+                            self.service_objects.append(o := self.Service(self, s[service], service))
                             o.grid(row=i, column=0, pady=(0, 5))
+                            o.row = i
+                        del self.pending[:SERVICE_BATCH]
+                        self.shown = set(self.service_objects)
+                        if self.pending:
+                            self.after(1, self.__build_batch)
                         if not len(s):  # No services
                             self.special_message(self.no_services, True, '#40ACE3')
 
+                    def __build_batch(self):
+                        if not self.winfo_exists():  # Logged out before all rows were built
+                            return
+                        s, end = manager.get_services(), len(self.service_objects)
+                        if end and not self.service_objects[-1].name:  # Keep a service being added last
+                            end -= 1
+                        batch = [self.Service(self, s[service], service) for service in self.pending[:SERVICE_BATCH]]
+                        for o in batch:
+                            o.grid(column=0, pady=(0, 5))
+                        self.service_objects[end:end] = batch
+                        del self.pending[:SERVICE_BATCH]
+                        # Apply the current order and search query to the new rows
+                        self.sort(sorting.cget('text') != 'A-Z')
+                        if not self.adding and not is_empty(q := search.query.get()):
+                            self.query(q)
+                        if self.pending:
+                            self.after(1, self.__build_batch)
+
                     def special_message(self, obj, _show: bool, color: str = None):
                         if _show:
                             self.configure(width=388, height=348, border_width=2, border_color=color,
@@ -740,26 +1042,49 @@ class GUI(ctk.CTk):
                         if not self.service_objects[-1].name:  # Last list item name is None (not added yet)
                             addition = self.service_objects[-1]
                             self.service_objects.pop(-1)
+                        previous, shown = self.service_objects, self.shown
                         self.service_objects = [o for o in sorted(self.service_objects, reverse=z_a,
                                                                   key=lambda o: o.name)]
-                        for i, o in enumerate(self.service_objects, 1 if addition else 0):
-                            o.grid_configure(row=i), o.tkraise()  # raise ensures proper TAB order
-                            # grid_configure places it again, so remove it if it is supposed to be unmapped
-                            # (does not match the current search query)
-                            if not o.name.lower().startswith(search.query.get().strip().lower()):
-                                o.grid_remove()
+                        self.index = None  # Sorting follows a change to the services
+                        self.shown = self.__matches(search.query.get())
+                        # Objects before the first one out of place are already in order
+                        moved = next((i for i, (a, b) in enumerate(zip(previous, self.service_objects)) if a is not b),
+                                     len(previous))
+                        start = 1 if addition else 0  # Row 0 is kept for the addition
+                        for i, o in enumerate(self.service_objects, start):
+                            if o.row != i:  # Only re-grid objects which changed row
+                                o.grid_configure(row=i)
+                                o.row = i
+                                # grid_configure places it again, so remove it if it is supposed to be unmapped
+                                # (does not match the current search query)
+                                if o not in self.shown:
+                                    o.grid_remove()
+                            elif (o in self.shown) != (o in shown):
+                                o.grid() if o in self.shown else o.grid_remove()
+                            if i - start >= moved:
+                                o.tkraise()  # raise ensures proper TAB order
                         if addition:  # Re-add the addition service box
                             self.service_objects.append(addition)
 
+                    def __matches(self, q: str) -> set:
+                        if self.index is None:
+                            pairs = sorted(((o.lower_name, o) for o in self.service_objects if o.name),
+                                           key=lambda p: p[0])
+                            self.index = [k for k, _ in pairs], [o for _, o in pairs]
+                        keys, objects = self.index
+                        # Names starting with the query are next to each other in the sorted index
+                        q = q.strip().lower()
+                        return set(objects[bisect_left(keys, q):bisect_left(keys, q + '\U0010FFFF')])
+
                     def query(self, q: str = ''):
-                        n = 0
-                        for o in self.service_objects:
-                            if o.name.lower().startswith(q.strip().lower()):  # If the object name starts with the query
-                                o.grid()
-                                n += 1
-                            else:  # Else remove it (keeps grid configuration)
-                                o.grid_remove()
-                        self.special_message(self.no_results, not n, '#ff3333')  # No results message
+                        matches = self.__matches(q)
+                        # Only change the objects which are shown or removed by the new query (keeps grid configuration)
+                        for o in self.shown - matches:
+                            o.grid_remove()
+                        for o in matches - self.shown:
+                            o.grid()
+                        self.shown = matches
+                        self.special_message(self.no_results, not matches, '#ff3333')  # No results message
 
                     def add(self):
                         if not self.adding:
@@ -772,8 +1097,10 @@ class GUI(ctk.CTk):
                             # --
                             self.adding = True
                             (new := self.Service(self, {})).grid(row=0, column=0, pady=(0, 5)), new.label.focus_set()
+                            new.row = 0
                             for i, o in enumerate(self.service_objects, 1):
                                 o.grid_configure(row=i)
+                                o.row = i
                             self.service_objects.append(new)
 
                 class Search(ctk.CTkFrame):  # Searchbar
@@ -790,12 +1117,11 @@ class GUI(ctk.CTk):
                         # Search icon
                         img = ctk.CTkLabel(self, 35, 35, 0, fg_color='#000000', bg_color=TRANS,
                                            text='', compound='left',
-                                           image=ctk.CTkImage(Image.open(f'{PATH}search.png'), size=(20, 20)))
+                                           image=_load_image(f'{PATH}search.png', (20, 20))[1])
                         set_opacity(img, color=TRANS), img.place(x=2, y=0)  # Remove BG and place
                         # Entry box for query
                         self.query = ctk.CTkEntry(self, 147, 30, 0, 0, fg_color='transparent', text_color='#212121',
-                                                  font=(JB, 18), validate='key', validatecommand=
-                                                  (self.register(lambda t: len(t) <= MAX_SERVICE_LENGTH), '%P'),
+                                                  font=(JB, 18), validate='key', validatecommand=service_validation,
                                                   placeholder_text_color='#919191', placeholder_text='Search')
                         self.query.bind('<KeyRelease>', lambda e: (
                             self.query.delete(0, 'end') if str(e.keysym) == 'Escape' else None,
@@ -819,15 +1145,17 @@ class GUI(ctk.CTk):
                             o.bind('<Leave>', lambda _: self.configure(fg_color='#55BB33'))  # Exit
                             o.bind('<Button-1>', lambda _: services.add())
                 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-                super().__init__(master), self.grid_propagate(False), self.grid_anchor('n')
+                super().__init__(master)
+                self.grid_propagate(False)
+                self.grid_anchor('n')
                 ctk.CTkLabel(self, text='Your services', text_color='#000000', font=(JB, 24)).grid(
                     row=0, column=0, columnspan=3, sticky='w', pady=(30, 2))  # Services header text
                 #
                 # ░░░░░░░░░░░░░░░░░░░
                 # SECOND ROW BUTTONS
                 (search := Search(self)).grid(row=1, column=0, sticky='w', padx=(0, 100))
-                sort = ctk.CTkImage(Image.open(f'{PATH}sort.png'),  size=(12, 10))
-                sort_flip = ctk.CTkImage(Image.open(f'{PATH}sort.png').transpose(Image.FLIP_LEFT_RIGHT), size=(12, 10))
+                pil, sort = _load_image(f'{PATH}sort.png', (12, 10))
+                sort_flip = ctk.CTkImage(pil.transpose(Image.FLIP_LEFT_RIGHT), size=(12, 10))
                 (sorting := ctk.CTkButton(
                     self, 75, 35, 5, 2, fg_color='transparent', border_color='#000000', hover_color='#FFFFFF',
                     text='A-Z', text_color='#000000', font=(JBB, 20),
@@ -841,33 +1169,28 @@ class GUI(ctk.CTk):
                 # ░░░░░░░░░░░░░░░░░░░
                 (services := Services(self)).grid(row=2, column=0, columnspan=3, pady=(10, 0))
                 # Change Password footer button
-                ctk.CTkButton(self, GUI.WIDTH, 40, 0, text='Change the master password', font=(JB, 12),
+                ctk.CTkButton(self, GUI.WIDTH, 40, 0, text='Change the master password', font=font_jb12,
                               text_color='#343434', fg_color='#E4E3E3', hover_color='#d8d8d8',
                               # provide this MainScreen instance, so it can return to the same one upon change
                               command=lambda: switch_screen(LoginScreen(master, True, self), True),
-                              image=ctk.CTkImage(Image.open(f'{PATH}edit.png'), size=(16, 16))
+                              image=_load_image(f'{PATH}edit.png', (16, 16))[1]
                               ).place(x=0, y=GUI.HEIGHT - 80)
                 # For mouse_off binding
                 self.mb = Services.Service, Services.Service.Account, services, sorting
 
         class LoginScreen(self.Screen):
+            # Built once with the GUI and shared by every LoginScreen, so switching screens never rebuilds them
+            # Background is a single opaque image covering only the area above the footer (never overlapping it)
+            stripes_img = ctk.CTkImage(_open_image(f'{PATH}stripes.png', '#FBFBFB')
+                                       .crop((0, 0, GUI.WIDTH, GUI.HEIGHT - 40)), size=(GUI.WIDTH, GUI.HEIGHT - 40))
+            back_imgs = (_load_image(f'{PATH}back_arrow.png', (32, 32))[1],  # Hover is shipped 1.3x brighter
+                         _load_image(f'{PATH}back_arrow_hover.png', (32, 32))[1])
+            warning_img = _load_image(f'{PATH}warning.png', (18, 18))[1]
+
             class Content(ctk.CTkFrame):  # Separate frame to keep it vertically centered
                 # noinspection PyMethodParameters
                 # self is _self here so switch_screen() can access parent CTk
                 def __init__(_self, master, new: bool, change: MainScreen = None):
-                    def validate(action, text: str) -> bool:  # Validate command
-                        if text == 'Password changed':
-                            return True
-                        if int(action):  # Insert
-                            try:
-                                text.encode('ascii')  # Raise EncodeError if Unicode
-                                # Below maximum password length and does not include spaces
-                                return len(text) <= MAX_PASS_LENGTH and ' ' not in text
-                            except UnicodeEncodeError:
-                                return False
-                        else:  # Backspace/deletion
-                            return True
-
                     def check_password(*_):  # Instantiate Manager class
                         def error():
                             _self.password.configure(border_color='#ff3333')
@@ -886,7 +1209,8 @@ class GUI(ctk.CTk):
                                 _self.focus_set()  # Remove focus from entry
                                 _self.button.configure(fg_color='#40ACE3', state='disabled')
                                 visibility.configure(state='disabled')
-                                _self.password.delete(0, 'end'), _self.password.insert(0, 'Password changed')
+                                _self.password.delete(0, 'end')
+                                _self.password.insert(0, 'Password changed')
                                 _self.password.configure(border_color='#40ACE3', state='disabled', show='',
                                                          text_color='#3295C7', justify='center', font=(JB, 20))
                                 self.after(1200, lambda: switch_screen(change))
@@ -905,81 +1229,83 @@ class GUI(ctk.CTk):
 
                     def reset(e):
                         # If the event character is valid, and above 0 characters, reset to normal colours
-                        if len(_self.password.get()) > 0 and validate(1, e.char):
+                        if len(_self.password.get()) > 0 and validate_password(1, e.char):
                             _self.password.configure(border_color='#B8B7B7')
                             _self.button.configure(fg_color='#55BB33', state='normal')
                     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
                     super().__init__(master, fg_color='transparent')
                     _self.processing = False
-                    label = ctk.CTkLabel(_self, text=f"{'Change' if change else 'Create' if new else 'Enter'} "
-                                                     f"your password", font=(JB, 16), text_color='#000000',
+                    mode = 'change' if change else 'new' if new else 'login'
+                    label = ctk.CTkLabel(_self, text=LOGIN_TITLES[mode], font=(JB, 16), text_color='#000000',
                                          fg_color=TRANS)
-                    set_opacity(label, color=TRANS), label.grid(row=0, column=0, sticky='w')
+                    set_opacity(label, color=TRANS)
+                    label.grid(row=0, column=0, sticky='w')
                     # Password Entry
                     _self.password = ctk.CTkEntry(_self, 300, 80, 0, 2, 'transparent', '#E4E4E4', '#B8B7B7',
                                                      '#000000', font=(JB, 28), show='*', validate='key',
-                                                  validatecommand=(_self.register(validate), '%d', '%P'))
+                                                  validatecommand=password_validation)
                     _self.password.bind('<Control-KeyPress-BackSpace>', lambda e: (reset(e),
                                                                                    _self.password.delete(0, 'end')))
-                    _self.password.bind('<KeyRelease-Return>', check_password)
-                    _self.password.bind('<KeyRelease>', reset)
+                    # One <KeyRelease> binding, ENTER checks the password
+                    _self.password.bind('<KeyRelease>',
+                                        lambda e: check_password() if e.keysym == 'Return' else reset(e))
                     _self.password.bind('<Tab>', lambda _: 'break')  # Disables TAB within password entry
-                    _self.button = ctk.CTkButton(_self, 50, 80, 0, fg_color='#55BB33', text='',
-                                                 hover_color='#5BCA37', command=check_password,
-                                                 image=ctk.CTkImage(Image.open(
-                                                      f'{PATH}{"edit" if change else "chev_right"}.png'),
-                                                      size=(22, 22) if change else (42, 42)))
+                    _self.button = ctk.CTkButton(_self, 50, 80, 0, **GREEN_BUTTON, text='', command=check_password,
+                                                 image=_load_image(*LOGIN_ICONS[mode])[1])
                     # --
                     (visibility := Visibility(_self, _self.password, width=50, anchor='center')).grid(
                         row=0, column=1, sticky='e')
-                    _self.password.grid(row=1, column=0), _self.button.grid(row=1, column=1)
+                    _self.password.grid(row=1, column=0)
+                    _self.button.grid(row=1, column=1)
 
             def __init__(self, master, new: bool, change: MainScreen = None):
-                super().__init__(master), self.grid_propagate(False), self.grid_anchor('center')
+                super().__init__(master)  # Every child uses place(), the screen is absolutely positioned
                 self.change = change  # Class attribute so inactivity timer can determine change status
                 # Stripes background
-                ctk.CTkLabel(self, text='', image=ctk.CTkImage(Image.open(f'{PATH}stripes.png'),
-                                                               size=(GUI.WIDTH, GUI.HEIGHT))).pack()
-                self.footer.tkraise()  # Footer above stripes background image
-                # Place content + set focus after 75ms to password entry box
-                (c := self.Content(self, new, change)).grid(pady=(0, 106)), self.after(75, c.password.focus_set)
+                ctk.CTkLabel(self, text='', image=self.stripes_img).place(x=0, y=0)
+                # Place content centered (53px up, to sit above the warnings) + set focus to password entry once idle
+                (c := self.Content(self, new, change)).place(relx=0.5, rely=0.5, y=-53, anchor='center')
+                self.after_idle(c.password.focus_set)
                 # ░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
                 placement = (45, 363)  # Default X/Y for Caps Lock
+                overlay = []  # (widget, x, y) - configured first, then placed together in one pass
                 if change:  # Back button
-                    back = ctk.CTkButton(self, 32, 32, 0, text='', fg_color=TRANS,
-                                         hover_color=TRANS, command=lambda: switch_screen(change) if not c.processing
-                                         else None)
-                    img_button_brightness(back, Image.open(f'{PATH}back_arrow.png'), (32, 32), 1.3)
-                    set_opacity(back, color=TRANS), back.place(x=45, y=45)
+                    back = ctk.CTkButton(self, 32, 32, 0, **ICON_BUTTON,
+                                         command=lambda: switch_screen(change) if not c.processing else None)
+                    img_button_hover(back, self.back_imgs)
+                    overlay.append((back, 45, 45))
                 if new:  # Label for first time startup warning user to remember password
-                    length = ctk.CTkLabel(self, text=f'The password must be between {MIN_PASS_LENGTH} and '
-                                                     f'{MAX_PASS_LENGTH} characters.', font=(JB, 12),
-                                          text_color='#000000', fg_color=TRANS)
-                    warning = ctk.CTkLabel(self, text="WARNING: Your password cannot be reset if you forget it. This "
-                                                      "could lead to permanent data loss! Ensure you keep record of "
-                                                      "your password.", font=(JB, 12), wraplength=350,
+                    length = ctk.CTkLabel(self, text=LENGTH_TEXT, font=font_jb12, text_color='#000000', fg_color=TRANS)
+                    warning = ctk.CTkLabel(self, text=WARNING_TEXT, font=font_jb12, wraplength=350,
                                            justify='left', fg_color=TRANS, text_color='#CC0202')
-                    set_opacity(length, color=TRANS), length.place(x=50, y=290)
-                    set_opacity(warning, color=TRANS), warning.place(x=50, y=315)
+                    overlay += (length, 50, 290), (warning, 50, 315)
                 else:  # Standard placement
                     placement = (45, 290)
+                for o, x, y in overlay:
+                    set_opacity(o, color=TRANS)
+                    o.place(x=x, y=y)
                 # ░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
-                try:  # Try to set up Caps Lock warning for Windows
-                    from ctypes import windll
-                    def listen():
-                        if windll.user32.GetKeyState(0x14):  # Turned on
-                            if not self.caps_lock.winfo_ismapped():
-                                self.caps_lock.place(x=placement[0], y=placement[1])
-                        else:
-                            self.caps_lock.place_forget()
-                        self.after(1, listen)
-                    self.caps_lock = ctk.CTkLabel(self, text='Caps Lock is On', text_color='#4046b6', font=(JBB, 12),
-                                                  fg_color=TRANS, compound='left', padx=5,
-                                                  image=ctk.CTkImage(Image.open(f'{PATH}warning.png'), size=(18, 18)))
-                    set_opacity(self.caps_lock, color=TRANS)
-                    self.after(1, listen)
-                except (Exception,):
-                    pass
+                if IS_WINDOWS:  # Caps Lock warning uses the Win32 API
+                    self.__caps_lock_warning(c.password, placement)
+
+            def __caps_lock_warning(self, entry: ctk.CTkEntry, placement: tuple[int, int]):
+                self.caps_placement, self.caps_state = placement, None
+                self.caps_lock = ctk.CTkLabel(self, text='Caps Lock is On', text_color='#4046b6', font=font_jbb12,
+                                              fg_color=TRANS, compound='left', padx=5, image=self.warning_img)
+                set_opacity(self.caps_lock, color=TRANS)
+                # No polling: Caps Lock can only change via a key release while the entry has focus, or while
+                # focus was elsewhere (including other windows), which is re-checked once focus returns
+                entry.bind('<FocusIn>', self.__check_caps_lock)
+                entry.bind('<KeyRelease>', self.__check_caps_lock)
+
+            def __check_caps_lock(self, _=None):
+                # Low bit is the toggle state, the high bit only means the key is held down
+                if (state := bool(get_key_state(0x14) & 1)) != self.caps_state:
+                    if state:  # Turned on
+                        self.caps_lock.place(x=self.caps_placement[0], y=self.caps_placement[1])
+                    else:
+                        self.caps_lock.place_forget()
+                    self.caps_state = state  # Only touch geometry again on the next transition
 
         # 〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉
         # Inactivity system for the MainScreen, so it will switch back to the login screen if there has
@@ -1008,6 +1334,10 @@ class GUI(ctk.CTk):
                     switch_screen(LoginScreen(self, False))
             self.after(1000, inactivity_timer)
 
+        def show_login():
+            switch_screen(LoginScreen(self, self.is_new))
+            inactivity_timer()  # Started here as it needs a real screen to check
+
         # 〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉〉
         # For handling Service and Account entry editing
         def recursive(i, obj):
@@ -1061,17 +1391,27 @@ class GUI(ctk.CTk):
                     pass
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
         super().__init__(fg_color='#FBFBFB')
-        # ctk.set_appearance_mode("dark")
+        # Shared fonts for the small text (needs the root window, used by the screens above)
+        font_jb12, font_jbb12 = ctk.CTkFont(JB, 12), ctk.CTkFont(JBB, 12)
+        # Entry validation commands, registered once on the root instead of once per entry
+        service_validation = (self.register(lambda t: len(t) <= MAX_SERVICE_LENGTH), '%P')
+        account_validation = (self.register(lambda t: ' ' not in t and len(t) <= MAX_USER_LENGTH), '%P')
+        password_validation = (self.register(validate_password), '%d', '%P')
         self.title("Password Safe"), self.iconbitmap(f'{PATH}favicon.ico')  # Favicon
         # Dimensions + disable ability to resize
         self.geometry(f"{self.WIDTH}x{self.HEIGHT}"), self.resizable(False, False)
         init_kill_handlers(lambda *_: self.quit())  # GUI kill handlers
-        # If path exists, it is not new, else it is
-        self.current_screen = LoginScreen(self, not os_path.exists(DATA_PATH))
+        # If path exists, it is not new, else it is (checked once, so later flows read this instead)
+        self.is_new = not os_path.exists(DATA_PATH)
+        # Blank screen so the window is drawn straight away, LoginScreen is built on the first idle tick.
+        # CTk keeps the root withdrawn until update() or mainloop(), its update() shows the window first
+        self.current_screen = self.Screen(self)
         self.current_screen.place(x=0, y=0)
+        self.update()
+        self.after_idle(show_login)
         # --
         self.timer = 0
-        inactivity_bindings(), inactivity_timer()
+        inactivity_bindings()
         self.bind('<Button-1>', mouse_off, '+')  # For editing Services & Accounts
         self.mainloop()
 